@@ -0,0 +1,43 @@
+import hashlib
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# How long (in seconds) a token lookup is served from the cache
+TOKEN_CACHE_TIMEOUT = 300
+
+
+def _token_cache_key(key):
+    # Hash the client-supplied token so the key has a fixed length and the
+    # token itself is never stored in the cache
+    return f"authtoken:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def cache_token(token):
+    """Store the token's user in the cache so the next requests skip the database."""
+    cache.set(
+        _token_cache_key(token.key),
+        {"user_id": token.user_id, "username": token.user.username},
+        TOKEN_CACHE_TIMEOUT,
+    )
+
+
+def uncache_token(key):
+    """Drop a token from the cache so the next request checks the database again."""
+    cache.delete(_token_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token to user lookup."""
+
+    def authenticate_credentials(self, key):
+        cached = cache.get(_token_cache_key(key))
+        if cached:
+            user = User(pk=cached["user_id"], username=cached["username"])
+            return (user, Token(key=key, user=user))
+
+        user, token = super().authenticate_credentials(key)
+        cache_token(token)
+        return (user, token)
@@ -0,0 +1,8 @@
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id hasher tuned to take about 250 ms per hash on production hardware."""
+    time_cost = 3
+    memory_cost = 64 * 1024  # KiB
+    parallelism = 4
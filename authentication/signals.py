@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import uncache_token
+
+
+@receiver(post_delete, sender=Token)
+def uncache_deleted_token(sender, instance, **kwargs):
+    """Stop authenticating with a token as soon as it is deleted."""
+    uncache_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def uncache_user_tokens(sender, instance, created, **kwargs):
+    """Drop the user's cached tokens so changes such as deactivation apply immediately."""
+    if created:
+        return
+
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        uncache_token(key)
@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from django.contrib.auth.models import User
 
+from .authentication import cache_token
 from .serializers import UserRegistrationSerializer
 
 
@@ -34,6 +35,7 @@ class UserLoginView(generics.GenericAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data["user"]
         token, created = Token.objects.get_or_create(user=user)
+        cache_token(token)
         return Response(
             {
                 "token": token.key,
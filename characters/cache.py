@@ -0,0 +1,31 @@
+import time
+
+from django.core.cache import cache
+
+CHARACTERS_CACHE_VERSION_KEY = "characters:version"
+
+
+def _new_version():
+    # Seed versions from the clock so a version lost to a memcached restart,
+    # eviction or outage is never handed out again
+    return time.time_ns()
+
+
+def get_characters_cache_version():
+    """Return the current version of the cached character data."""
+    version = cache.get(CHARACTERS_CACHE_VERSION_KEY)
+    if version is None:
+        seed = _new_version()
+        cache.add(CHARACTERS_CACHE_VERSION_KEY, seed, None)
+        # Another process may have seeded it first; without memcached use our own seed
+        version = cache.get(CHARACTERS_CACHE_VERSION_KEY, seed)
+    return version
+
+
+def bump_characters_cache_version():
+    """Invalidate all cached character responses by bumping the version."""
+    try:
+        cache.incr(CHARACTERS_CACHE_VERSION_KEY)
+    except ValueError:
+        # The version key does not exist (any more)
+        cache.add(CHARACTERS_CACHE_VERSION_KEY, _new_version(), None)
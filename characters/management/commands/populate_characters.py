@@ -1,12 +1,22 @@
-import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import hashlib
+import operator
+from collections import defaultdict
+from functools import reduce
+
+import httpx
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from django.db import transaction
+from django.db.models import Q
 
+from characters.cache import bump_characters_cache_version
 from characters.models import Character, Master
 from characters.services import BiographyGenerator, EvilnessClassifier, SemanticSearchService
 
+# API values meaning a numeric field is not known
+UNKNOWN_VALUES = frozenset({None, "unknown", ""})
+DECIMAL_COMMA_TABLE = str.maketrans({",": "."})
+
 
 class Command(BaseCommand):
     help = "Populate the database with Star Wars characters from the external API."
@@ -27,7 +37,7 @@ class Command(BaseCommand):
             "--max-workers",
             type=int,
             default=8,
-            help="Maximum number of concurrent workers",
+            help="Maximum number of concurrent AI requests",
         )
 
     def handle(self, *args, **options):
@@ -35,11 +45,13 @@ class Command(BaseCommand):
 
         max_workers = options["max_workers"]
 
+        # Shared HTTP/2 connection pools for the Star Wars API and OpenAI requests
+        http_client = httpx.Client(http2=True, timeout=30, follow_redirects=True)  # Wait max 30 seconds for a response
+        http_async_client = None
+
         try:
             # Fetch data from external API
-            response = requests.get(
-                settings.STARWARS_API_URL, timeout=30
-            )  # Wait max 30 seconds for a response
+            response = http_client.get(settings.STARWARS_API_URL)
             response.raise_for_status()
             characters_data = response.json()
 
@@ -61,9 +73,18 @@ class Command(BaseCommand):
             if not options["skip_ai"]:
                 try:
                     if settings.OPENAI_API_KEY:
-                        biography_generator = BiographyGenerator()
-                        evilness_classifier = EvilnessClassifier()
-                        search_service = SemanticSearchService()
+                        http_async_client = httpx.AsyncClient(
+                            http2=True,
+                            timeout=60,
+                            limits=httpx.Limits(max_connections=max_workers * 4),
+                        )
+                        http_clients = {
+                            "http_client": http_client,
+                            "http_async_client": http_async_client,
+                        }
+                        biography_generator = BiographyGenerator(**http_clients)
+                        evilness_classifier = EvilnessClassifier(**http_clients)
+                        search_service = SemanticSearchService(**http_clients)
                         self.stdout.write("AI services initialized.")
                     else:
                         self.stderr.write(
@@ -74,13 +95,34 @@ class Command(BaseCommand):
                         f"Failed to initialize AI services: {e}."
                     )
 
-            # Process all characters concurrently
-            self.stdout.write(f"Processing {len(characters_data)} characters with {max_workers} workers...")
+            # Create or update all characters in a single query
+            total_created, total_updated = self._bulk_upsert_characters(characters_data)
 
-            total_created, total_updated = self._process_characters_concurrent(
-                characters_data, biography_generator, evilness_classifier,
-                search_service, max_workers
-            )
+            # Synchronize masters for all characters at once
+            master_names = self._bulk_sync_masters(characters_data)
+
+            if biography_generator and evilness_classifier and search_service:
+                # Only load the columns the AI pipeline reads
+                characters = Character.objects.only(
+                    "id", "name", "species", "homeworld", "affiliations_data",
+                    "biography", "is_evil", "description_hash",
+                ).in_bulk([char_data["id"] for char_data in characters_data])
+
+                # Generate all AI content with concurrent requests, then store it at once
+                self.stdout.write(
+                    f"Generating AI content for {len(characters)} characters "
+                    f"with up to {max_workers} concurrent requests..."
+                )
+                ai_updates = asyncio.run(
+                    self._generate_ai_content(
+                        characters, characters_data, master_names, biography_generator,
+                        evilness_classifier, search_service, http_async_client, max_workers
+                    )
+                )
+                self._bulk_update_ai_fields(ai_updates)
+
+            # Bulk operations do not send signals, so invalidate cached responses here
+            bump_characters_cache_version()
 
             self.stdout.write(
                 self.style.SUCCESS(
@@ -89,167 +131,237 @@ class Command(BaseCommand):
                 )
             )
 
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             self.stderr.write(f"Error fetching data from API: {e}")
             return
         except Exception as e:
             self.stderr.write(f"Unexpected error: {e}")
             return
+        finally:
+            http_client.close()
+            # The AI pipeline closes the async client itself; this covers failures before it ran
+            if http_async_client is not None and not http_async_client.is_closed:
+                asyncio.run(http_async_client.aclose())
+
+    def _bulk_upsert_characters(self, characters_data):
+        """Create or update all characters from the API data in bulk."""
+        character_ids = [char_data["id"] for char_data in characters_data]
+        existing_ids = set(
+            Character.all_objects.filter(id__in=character_ids).values_list("id", flat=True)
+        )
 
-    def _process_characters_concurrent(self, characters_data, biography_generator=None,
-                                     evilness_classifier=None, search_service=None, max_workers=4):
-        """Process all characters concurrently using ThreadPoolExecutor."""
-        created_count = 0
-        updated_count = 0
-        total_characters = len(characters_data)
-        processed_count = 0
-
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all character processing tasks
-            future_to_char = {
-                executor.submit(
-                    self._process_character,
-                    char_data, biography_generator, evilness_classifier, search_service
-                ): char_data
-                for char_data in characters_data
-            }
-
-            # Process completed tasks as they finish
-            for future in as_completed(future_to_char):
-                char_data = future_to_char[future]
-                processed_count += 1
-
-                try:
-                    character, created = future.result()
-                    if created:
-                        created_count += 1
-                    else:
-                        updated_count += 1
-
-                    # Progress update every 10 characters or at the end
-                    if processed_count % 10 == 0 or processed_count == total_characters:
-                        self.stdout.write(
-                            f"Progress: {processed_count}/{total_characters} characters processed "
-                            f"({created_count} created, {updated_count} updated)"
-                        )
-
-                except Exception as e:
-                    self.stderr.write(
-                        f"Error processing character {char_data.get('name', 'unknown')}: {e}"
-                    )
-                    continue
-
-        return created_count, updated_count
-
-    @transaction.atomic
-    def _process_character(self, char_data, biography_generator=None, evilness_classifier=None, search_service=None):
-        """Process a single character from the API data."""
-
-        # Get or create character
-        character, created = Character.objects.update_or_create(
-            id=char_data["id"],
-            defaults={
-                "name": char_data.get("name"),
-                "height": self._safe_float(char_data.get("height")),
-                "mass": self._safe_float(char_data.get("mass")),
-                "gender": char_data.get("gender"),
-                "homeworld": char_data.get("homeworld"),
-                "species": char_data.get("species"),
-                "image_url": char_data.get("image"),
-                "affiliations_data": char_data.get("affiliations", []),
-            },
+        characters = [
+            Character(
+                id=char_data["id"],
+                name=char_data.get("name"),
+                height=self._safe_float(char_data.get("height")),
+                mass=self._safe_float(char_data.get("mass")),
+                gender=char_data.get("gender"),
+                homeworld=char_data.get("homeworld"),
+                species=char_data.get("species"),
+                image_url=char_data.get("image"),
+                affiliations_data=char_data.get("affiliations", []),
+            )
+            for char_data in characters_data
+        ]
+
+        Character.objects.bulk_create(
+            characters,
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=[
+                "name", "height", "mass", "gender", "homeworld",
+                "species", "image_url", "affiliations_data", "updated_at",
+            ],
+            batch_size=500,
         )
 
-        # Process masters
-        masters_data = char_data.get("masters", [])
-        self._process_masters(character, masters_data)
+        created_count = len(set(character_ids) - existing_ids)
+        return created_count, len(character_ids) - created_count
+
+    async def _generate_ai_content(self, characters, characters_data, master_names,
+                                   biography_generator, evilness_classifier, search_service,
+                                   http_async_client, max_concurrency):
+        """Generate evilness classifications, biographies and embeddings for all characters.
+
+        Returns the generated values as a {character_id: {field: value}} dict.
+        """
+        ai_updates = defaultdict(dict)
+        characters_data = [
+            char_data for char_data in characters_data if char_data["id"] in characters
+        ]
+        characters_to_classify = [
+            char_data for char_data in characters_data
+            if not characters[char_data["id"]].is_evil
+        ]
+        characters_to_describe = [
+            char_data for char_data in characters_data
+            if not characters[char_data["id"]].biography
+        ]
+
+        # Classification and biographies run side by side and share the request budget
+        classify_concurrency = max(1, max_concurrency // 2)
+        describe_concurrency = max(1, max_concurrency - classify_concurrency)
 
-        # Classify evilness
-        if evilness_classifier and not character.is_evil:
-            masters_names = [
-                master.master_name for master in Master.objects.filter(character=character)
-            ]
-            try:
-                evilness_result = evilness_classifier.classify_evilness(char_data, masters_names)
-                # Update character with evilness classification
-                character.is_evil = evilness_result.is_evil
-                character.evilness_score = evilness_result.evilness_score
-                character.evilness_explanation = evilness_result.evilness_explanation
-            except Exception as e:
-                self.stdout.write(f"Failed to classify evilness for {character.name}: {e}")
+        try:
+            classify = evilness_classifier.classify_many(
+                [
+                    (char_data, master_names[char_data["id"]])
+                    for char_data in characters_to_classify
+                ],
+                max_concurrency=classify_concurrency,
+            )
+            describe = biography_generator.generate_many(
+                characters_to_describe, max_concurrency=describe_concurrency
+            )
+            if max_concurrency > 1:
+                evilness_results, biographies = await asyncio.gather(classify, describe)
+            else:
+                evilness_results = await classify
+                biographies = await describe
+
+            for char_data, evilness_result in zip(characters_to_classify, evilness_results):
+                ai_updates[char_data["id"]].update(
+                    is_evil=evilness_result.is_evil,
+                    evilness_score=evilness_result.evilness_score,
+                    evilness_explanation=evilness_result.evilness_explanation,
+                )
 
-        # Generate biography if AI services are available
-        if biography_generator and not character.biography:
-            try:
-                character.biography = biography_generator.generate_biography(char_data)
-            except Exception as e:
-                self.stdout.write(f"Failed to generate biography for {character.name}: {e}")
+            for char_data, biography in zip(characters_to_describe, biographies):
+                characters[char_data["id"]].biography = biography
+                ai_updates[char_data["id"]]["biography"] = biography
 
-        # Save the character
-        character.save()
+            self.stdout.write(
+                f"Classified {len(characters_to_classify)} characters and "
+                f"generated {len(characters_to_describe)} biographies."
+            )
+
+            # The description includes the biography, so embeddings are generated last.
+            # Characters whose description did not change keep their embedding.
+            embedded_characters = []
+            descriptions = []
+            for char_data in characters_data:
+                character = characters[char_data["id"]]
+                description = character.get_description_for_embeddings()
+                description_hash = self._description_hash(description)
+                stored_hash = character.description_hash
+                if stored_hash is None or bytes(stored_hash) != description_hash:
+                    embedded_characters.append((character, description_hash))
+                    descriptions.append(description)
 
-        # Generate embeddings for semantic search
-        if search_service:
             try:
-                search_service.update_character_embedding(character)
-            except Exception as e:
-                self.stdout.write(
-                    f"Failed to generate embedding for {character.name}: {e}"
+                embedding_vectors = (
+                    await search_service.agenerate_embeddings(descriptions) if descriptions else []
                 )
-
-        return character, created
-
-    def _process_masters(self, character, masters_data):
-        """Process masters data for a character."""
-        if isinstance(masters_data, str):
-            # If masters_data is a string, treat it as a single master
-            masters_data = [masters_data]
-
-        if masters_data:
-            # Clean and prepare master names
-            new_master_names = {
-                name.strip() for name in masters_data if name and name.strip()
-            }
-
-            if new_master_names:
-                # Get existing masters for this character
-                existing_master_names = set(
-                    Master.objects.filter(character=character).values_list(
-                        "master_name", flat=True
+                for (character, description_hash), embedding_vector in zip(
+                    embedded_characters, embedding_vectors
+                ):
+                    ai_updates[character.id].update(
+                        description_embedding=embedding_vector,
+                        description_hash=description_hash,
                     )
+                self.stdout.write(
+                    f"Generated embeddings for {len(embedded_characters)} characters "
+                    f"({len(characters_data) - len(embedded_characters)} unchanged)."
                 )
+            except Exception as e:
+                self.stderr.write(f"Failed to generate embeddings: {e}")
 
-                # Determine which masters to add and remove
-                masters_to_add = new_master_names - existing_master_names
-                masters_to_remove = existing_master_names - new_master_names
-
-                # Remove masters that are no longer needed
-                if masters_to_remove:
-                    Master.objects.filter(
-                        character=character, master_name__in=masters_to_remove
-                    ).delete()
-
-                # Add new masters only
-                if masters_to_add:
-                    Master.objects.bulk_create(
-                        [
-                            Master(character=character, master_name=name)
-                            for name in masters_to_add
-                        ]
-                    )
+        except Exception as e:
+            self.stderr.write(f"Failed to generate AI content: {e}")
+        finally:
+            await http_async_client.aclose()
+
+        return ai_updates
+
+    def _description_hash(self, description):
+        """Short digest of an embedding description, used to detect changes."""
+        return hashlib.blake2b(description.encode(), digest_size=8).digest()
+
+    def _bulk_update_ai_fields(self, ai_updates):
+        """Store the AI-generated fields in bulk, writing only the generated columns."""
+        # bulk_update writes the same columns for every row, so group rows by their columns
+        characters_by_fields = defaultdict(list)
+        for character_id, values in ai_updates.items():
+            characters_by_fields[tuple(sorted(values))].append(
+                Character(id=character_id, **values)
+            )
+
+        for fields, characters in characters_by_fields.items():
+            Character.objects.bulk_update(characters, fields, batch_size=500)
+
+    def _bulk_sync_masters(self, characters_data):
+        """Synchronize masters for all characters with a single diff."""
+        character_ids = [char_data["id"] for char_data in characters_data]
+
+        # A single master can come as a plain string instead of a list
+        desired_masters = {
+            (char_data["id"], name)
+            for char_data in characters_data
+            for raw_name in (
+                [char_data["masters"]]
+                if isinstance(char_data.get("masters"), str)
+                else char_data.get("masters") or []
+            )
+            if raw_name and (name := raw_name.strip())
+        }
+
+        # Soft-deleted masters still hold their (character, master_name) pair
+        live_masters = set()
+        deleted_masters = set()
+        for character_id, name, is_deleted in Master.all_objects.filter(
+            character_id__in=character_ids
+        ).values_list("character_id", "master_name", "is_deleted"):
+            (deleted_masters if is_deleted else live_masters).add((character_id, name))
+
+        # Determine which masters to add, restore and remove
+        masters_to_restore = desired_masters & deleted_masters
+        masters_to_add = desired_masters - live_masters - deleted_masters
+        masters_to_remove = live_masters - desired_masters
+
+        # Remove masters that are no longer needed
+        if masters_to_remove:
+            Master.objects.filter(self._masters_filter(masters_to_remove)).delete()
+
+        # Bring back masters that were soft-deleted
+        if masters_to_restore:
+            Master.all_objects.filter(self._masters_filter(masters_to_restore)).update(
+                is_deleted=False
+            )
+
+        # Add new masters only
+        if masters_to_add:
+            Master.objects.bulk_create(
+                [
+                    Master(character_id=character_id, master_name=name)
+                    for character_id, name in masters_to_add
+                ]
+            )
 
-        else:
-            # If no masters data, ensure no masters exist for this character
-            Master.objects.filter(character=character).delete()
+        # Master names per character, used for the evilness classification
+        master_names = {character_id: [] for character_id in character_ids}
+        for character_id, name in desired_masters:
+            master_names[character_id].append(name)
+        return master_names
+
+    def _masters_filter(self, masters):
+        """Filter matching a set of (character_id, master_name) pairs."""
+        return reduce(
+            operator.or_,
+            (
+                Q(character_id=character_id, master_name=name)
+                for character_id, name in masters
+            ),
+        )
 
     def _safe_float(self, value):
         """Safely convert value to float"""
-        if value is None or value == "unknown" or value == "":
-            return None
         try:
+            if value in UNKNOWN_VALUES:
+                return None
             # Handle comma as decimal separator
             if isinstance(value, str):
-                value = value.replace(",", ".")
+                return float(value.translate(DECIMAL_COMMA_TABLE))
             return float(value)
         except (ValueError, TypeError):
             return None
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-15 20:31
+
+import pgvector.django.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0004_character_description_embedding'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='character',
+            index=pgvector.django.indexes.HnswIndex(ef_construction=64, fields=['description_embedding'], m=16, name='char_emb_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-15 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0005_character_description_embedding_hnsw'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='character',
+            name='is_evil',
+            field=models.BooleanField(default=False, help_text='Classification by AI if the character is evil.'),
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['is_evil', 'evilness_score'], name='char_evil_score_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-15 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0006_character_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='character',
+            name='description_hash',
+            field=models.BinaryField(blank=True, help_text='Hash of the description the embedding was generated from.', max_length=8, null=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-15 20:43
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0007_character_description_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='character',
+            name='search_vec',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            sql="""
+                CREATE TRIGGER characters_character_search_vec_update
+                BEFORE INSERT OR UPDATE OF name, species, homeworld, search_vec
+                ON characters_character
+                FOR EACH ROW EXECUTE FUNCTION
+                tsvector_update_trigger(search_vec, 'pg_catalog.simple', name, species, homeworld);
+
+                UPDATE characters_character
+                SET search_vec = to_tsvector(
+                    'pg_catalog.simple',
+                    coalesce(name, '') || ' ' || coalesce(species, '') || ' ' || coalesce(homeworld, '')
+                );
+            """,
+            reverse_sql="""
+                DROP TRIGGER IF EXISTS characters_character_search_vec_update ON characters_character;
+            """,
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vec'], name='char_search_vec_gin'),
+        ),
+    ]
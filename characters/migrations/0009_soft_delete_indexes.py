@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-15 20:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0008_character_search_vec'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='character',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='master',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+    ]
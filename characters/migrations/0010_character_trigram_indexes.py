@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-15 20:47
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0009_soft_delete_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='character',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='char_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('species'), name='gin_trgm_ops'), name='char_species_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('homeworld'), name='gin_trgm_ops'), name='char_homeworld_trgm'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-15 20:49
+
+import pgvector.django.halfvec
+import pgvector.django.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0010_character_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='character',
+            name='char_emb_hnsw',
+        ),
+        migrations.AlterField(
+            model_name='character',
+            name='description_embedding',
+            field=pgvector.django.halfvec.HalfVectorField(blank=True, dimensions=1536, help_text='Vector embedding for semantic search.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=pgvector.django.indexes.HnswIndex(ef_construction=64, fields=['description_embedding'], m=16, name='char_emb_hnsw', opclasses=['halfvec_cosine_ops']),
+        ),
+    ]
@@ -1,6 +1,9 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Upper
 from django.core.validators import MinValueValidator, MaxValueValidator
-from pgvector.django import VectorField
+from pgvector.django import HalfVectorField, HnswIndex
 
 from core.models import SoftDeleteModel
 
@@ -19,7 +22,7 @@ class Character(SoftDeleteModel):
 
     # AI Generated Fields
     biography = models.TextField(null=True, blank=True, help_text="AI-generated biography of the character.")
-    is_evil = models.BooleanField(default=False, help_text="Classification by AI if the character is evil.", db_index=True)
+    is_evil = models.BooleanField(default=False, help_text="Classification by AI if the character is evil.")
     evilness_score = models.IntegerField(
         null=True,
         blank=True,
@@ -30,13 +33,23 @@ class Character(SoftDeleteModel):
     evilness_explanation = models.TextField(null=True, blank=True, help_text="Explanation of the evilness score by AI.")
 
     # For semantic search
-    description_embedding = VectorField(
+    # Stored as half precision, which halves the size of the rows and the HNSW index
+    description_embedding = HalfVectorField(
         dimensions=1536, # Default length of "text-embedding-3-small" embeddings
         null=True,
         blank=True,
         help_text="Vector embedding for semantic search.",
     )
+    description_hash = models.BinaryField(
+        max_length=8,
+        null=True,
+        blank=True,
+        help_text="Hash of the description the embedding was generated from.",
+    )
+
 
+    # Full-text search document over name, species and homeworld, kept up to date by a database trigger
+    search_vec = SearchVectorField(null=True, editable=False)
 
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
@@ -44,6 +57,23 @@ class Character(SoftDeleteModel):
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            HnswIndex(
+                name='char_emb_hnsw',
+                fields=['description_embedding'],
+                m=16,
+                ef_construction=64,
+                opclasses=['halfvec_cosine_ops'],
+            ),
+            GinIndex(name='char_search_vec_gin', fields=['search_vec']),
+            # Trigram indexes serve the icontains filters of the character list,
+            # which Django compiles to UPPER(column) LIKE UPPER(pattern)
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='char_name_trgm'),
+            GinIndex(OpClass(Upper('species'), name='gin_trgm_ops'), name='char_species_trgm'),
+            GinIndex(OpClass(Upper('homeworld'), name='gin_trgm_ops'), name='char_homeworld_trgm'),
+            # Also serves lookups on is_evil alone
+            models.Index(name='char_evil_score_idx', fields=['is_evil', 'evilness_score']),
+        ]
 
     def __str__(self):
         return self.name
@@ -33,8 +33,7 @@ class CharacterDetailSerializer(serializers.ModelSerializer):
 
     def get_masters(self, obj):
         """Resturn a list of masters for the character."""
-        masters = Master.objects.filter(character=obj)
-        return [master.master_name for master in masters]
+        return [master.master_name for master in obj.masters.all()]
 
 class CharacterSearchSeializer(serializers.Serializer):
     """Serializer for semantic search requests"""
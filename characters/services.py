@@ -1,82 +1,129 @@
-from typing import List, Dict, Any
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 
+import httpx
+import numpy as np
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_core.messages import HumanMessage
-from sklearn.metrics.pairwise import cosine_similarity
+from langchain_core.messages import BaseMessage
+from langchain_core.prompts import ChatPromptTemplate
+from pgvector import HalfVector
+from pgvector.django import CosineDistance
 
+from .cache import get_characters_cache_version
 from .schemas import EvilnessClassification
 from .models import Character
+from .serializers import CharacterListSerializer
+
+logger = logging.getLogger(__name__)
+
+# How long (in seconds) the results of a semantic search are cached
+SEARCH_CACHE_TIMEOUT = 60 * 10
+
+# Number of distinct search queries whose embedding is kept in memory
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+
+# Size and cosine similarity threshold of the in-process semantic query cache
+SEMANTIC_CACHE_SIZE = 1000
+SEMANTIC_CACHE_THRESHOLD = 0.95
+
+# Default number of HNSW candidates considered by a semantic search (pgvector's default)
+HNSW_EF_SEARCH = 40
+
+# Names, affiliations and masters that mark a character as evil
+EVIL_NAME_PATTERN = re.compile(r"\b(darth|sith)\b", re.IGNORECASE)
 
 
 class BiographyGenerator:
     """Service for generating character biographies using AI."""
 
-    def __init__(self):
+    prompt_template = ChatPromptTemplate.from_template("""
+Write a short, engaging biography (2-3 sentences) for the Star Wars character {name}.
+
+Here are some known details:
+- Species: {species}
+- Homeworld: {homeworld}
+- Affiliations: {affiliations}
+
+Keep it concise, interesting, and true to the Star Wars universe. Focus on their role and significance.
+""")
+
+    def __init__(
+        self,
+        http_client: Optional[httpx.Client] = None,
+        http_async_client: Optional[httpx.AsyncClient] = None,
+    ):
         if not settings.OPENAI_API_KEY:
             raise ValueError("OpenAI API key not configured")
         self.llm = ChatOpenAI(
             model="gpt-5-nano",
             api_key=settings.OPENAI_API_KEY,
-            temperature=0.7
+            temperature=0.7,
+            http_client=http_client,
+            http_async_client=http_async_client,
         )
 
-    def generate_biography(self, character_data: Dict[str, Any]) -> str:
-        """Generate a short biography for a character"""
+    def _build_messages(self, character_data: Dict[str, Any]) -> List[BaseMessage]:
+        """Build the biography prompt messages for a character."""
+        affiliations = character_data.get("affiliations", [])
+
+        return self.prompt_template.format_messages(
+            name=character_data.get("name", "Unknown Character"),
+            species=character_data.get("species", "Unknown Species"),
+            homeworld=character_data.get("homeworld", "Unknown Homeworld"),
+            affiliations=", ".join(affiliations) if affiliations else "None known",
+        )
+
+    def _fallback_biography(self, character_data: Dict[str, Any]) -> str:
+        """Biography used when the AI generation fails."""
         name = character_data.get("name", "Unknown Character")
         species = character_data.get("species", "Unknown Species")
         homeworld = character_data.get("homeworld", "Unknown Homeworld")
-        affiliations = ", ".join(character_data.get("affiliations", []))
-
-        prompt = f"""
-Write a short, engaging biography (2-3 sentences) for the Star Wars character {name}.
+        return f"A {species} from {homeworld}, {name} is a character of interest."
 
-Here are some known details:
-- Species: {species}
-- Homeworld: {homeworld}
-- Affiliations: {", ".join(affiliations) if affiliations else "None known"}
+    async def generate_many(
+        self, characters_data: List[Dict[str, Any]], max_concurrency: int = 32
+    ) -> List[str]:
+        """Generate biographies for many characters concurrently."""
+        messages = [
+            self._build_messages(character_data) for character_data in characters_data
+        ]
 
-Keep it concise, interesting, and true to the Star Wars universe. Focus on their role and significance.
-"""
+        responses = await self.llm.abatch(
+            messages,
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        )
 
-        try:
-            message = HumanMessage(content=prompt)
-            response = self.llm.invoke([message])
-            return response.content.strip()
-        except Exception as e:
-            print(f"Error generating biography: {e}")
-            # Return a fallback message if AI generation fails
-            return f"A {species} from {homeworld}, {name} is a character of interest."
+        biographies = []
+        for character_data, response in zip(characters_data, responses):
+            if isinstance(response, Exception):
+                logger.warning("Error generating biography: %s", response)
+                biographies.append(self._fallback_biography(character_data))
+            else:
+                biographies.append(response.content.strip())
+        return biographies
 
 
 class EvilnessClassifier:
     """Service for classifying character evilness using AI with structured output."""
 
-    def __init__(self):
-        if not settings.OPENAI_API_KEY:
-            raise ValueError("OpenAI API key not configured")
-        self.llm = ChatOpenAI(
-            model="gpt-5-mini", api_key=settings.OPENAI_API_KEY, temperature=0.3
-        )
-
-    def classify_evilness(
-        self, character_data: Dict[str, Any], master_names: List[str] = []
-    ) -> EvilnessClassification:
-        """Classify a character's evilness with structured output."""
-        name = character_data.get("name", "Unknown Character")
-        species = character_data.get("species", "Unknown Species")
-        homeworld = character_data.get("homeworld", "Unknown Homeworld")
-        affiliations = character_data.get("affiliations", [])
-
-        prompt = f"""
+    prompt_template = ChatPromptTemplate.from_template("""
 Analyze the Star Wars character {name} and classify their evilness based on some rules
 
 Character Details:
 - Name: {name}
 - Species: {species}
 - Homeworld: {homeworld}
-- Affiliations: {", ".join(affiliations) if affiliations else "None known"}
-- Masters: {", ".join(master_names) if master_names else "None known"}
+- Affiliations: {affiliations}
+- Masters: {masters}
 
 A character is considered evil if:
 - They have 'Darth' or 'Sith' in their name
@@ -91,71 +138,291 @@ Provide:
 1. is_evil: True if evil, False if not
 2. evilness_score: 0-100 scale (0 = pure good, 100 = pure evil)
 3. evilness_explanation: Detailed reasoning for the classification
-"""
+""")
 
-        try:
-            structured_llm = self.llm.with_structured_output(EvilnessClassification)
-            message = HumanMessage(content=prompt)
-            response = structured_llm.invoke([message])
-            return response
-        except Exception as e:
-            print(f"Error classifying evilness: {e}")
-            # Return fallback classification
+    def __init__(
+        self,
+        http_client: Optional[httpx.Client] = None,
+        http_async_client: Optional[httpx.AsyncClient] = None,
+    ):
+        if not settings.OPENAI_API_KEY:
+            raise ValueError("OpenAI API key not configured")
+        self.llm = ChatOpenAI(
+            model="gpt-5-mini",
+            api_key=settings.OPENAI_API_KEY,
+            temperature=0.3,
+            http_client=http_client,
+            http_async_client=http_async_client,
+        )
+        self.structured_llm = self.llm.with_structured_output(EvilnessClassification)
+
+    def _build_messages(
+        self, character_data: Dict[str, Any], master_names: List[str]
+    ) -> List[BaseMessage]:
+        """Build the evilness classification prompt messages for a character."""
+        affiliations = character_data.get("affiliations", [])
+
+        return self.prompt_template.format_messages(
+            name=character_data.get("name", "Unknown Character"),
+            species=character_data.get("species", "Unknown Species"),
+            homeworld=character_data.get("homeworld", "Unknown Homeworld"),
+            affiliations=", ".join(affiliations) if affiliations else "None known",
+            masters=", ".join(master_names) if master_names else "None known",
+        )
+
+    def _rule_classification(
+        self, character_data: Dict[str, Any], master_names: List[str]
+    ) -> Optional[EvilnessClassification]:
+        """Classify unambiguous characters with the evilness rules, without the AI.
+
+        Returns None when only some of the rules match, in which case the AI
+        has to decide.
+        """
+        name = character_data.get("name") or "Unknown Character"
+        affiliations = character_data.get("affiliations") or []
+
+        matches = [
+            bool(EVIL_NAME_PATTERN.search(name)),
+            any(EVIL_NAME_PATTERN.search(affiliation) for affiliation in affiliations),
+            any(EVIL_NAME_PATTERN.search(master_name) for master_name in master_names),
+        ]
+
+        if all(matches):
+            return EvilnessClassification(
+                is_evil=True,
+                evilness_score=95,
+                evilness_explanation=(
+                    f"{name} has 'Darth' or 'Sith' in their name, is affiliated with "
+                    "the Sith and was trained by a Sith master."
+                ),
+            )
+        if not any(matches):
             return EvilnessClassification(
                 is_evil=False,
-                evilness_score=0,
-                evilness_explanation=f"Unable to classify {name}. Defaulted to good.",
+                evilness_score=5,
+                evilness_explanation=(
+                    f"{name} has no 'Darth' or 'Sith' in their name, no Sith "
+                    "affiliations and no Sith masters."
+                ),
             )
+        return None
+
+    def _fallback_classification(self, character_data: Dict[str, Any]) -> EvilnessClassification:
+        """Classification used when the AI classification fails."""
+        name = character_data.get("name", "Unknown Character")
+        return EvilnessClassification(
+            is_evil=False,
+            evilness_score=0,
+            evilness_explanation=f"Unable to classify {name}. Defaulted to good.",
+        )
+
+    async def classify_many(
+        self,
+        characters: List[Tuple[Dict[str, Any], List[str]]],
+        max_concurrency: int = 32,
+    ) -> List[EvilnessClassification]:
+        """Classify many characters concurrently.
+
+        Takes a list of (character_data, master_names) pairs and returns the
+        classifications in the same order. Only characters the rules cannot
+        classify on their own are sent to the AI.
+        """
+        results = [
+            self._rule_classification(character_data, master_names)
+            for character_data, master_names in characters
+        ]
+        ambiguous = [index for index, result in enumerate(results) if result is None]
+        if not ambiguous:
+            return results
+
+        messages = [self._build_messages(*characters[index]) for index in ambiguous]
+
+        responses = await self.structured_llm.abatch(
+            messages,
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        )
+
+        for index, response in zip(ambiguous, responses):
+            if isinstance(response, Exception):
+                logger.warning("Error classifying evilness: %s", response)
+                response = self._fallback_classification(characters[index][0])
+            results[index] = response
+        return results
+
+
+class SemanticQueryCache:
+    """In-process cache of search results, matched on query embedding similarity.
+
+    A query hits the cache when an earlier query with the same limit and
+    character data version has a cosine similarity of at least `threshold`.
+    The least recently used entry is evicted once `max_entries` is reached.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SEMANTIC_CACHE_SIZE,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+    ):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._version = None
+        # Unit length query embeddings, one row per slot, allocated on the first insert
+        self._embeddings: Optional[np.ndarray] = None
+        self._limits = np.zeros(max_entries, dtype=np.int32)
+        self._results: List[Optional[List[int]]] = [None] * max_entries
+        # Used slots, least recently used first
+        self._lru: "OrderedDict[int, None]" = OrderedDict()
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def get(self, embedding: np.ndarray, limit: int, version: int) -> Optional[List[int]]:
+        """Return the character ids cached for a similar query, if any."""
+        query = self._normalize(embedding)
+        with self._lock:
+            if version != self._version or not self._lru:
+                return None
+            if query.shape[0] != self._embeddings.shape[1]:
+                return None
+
+            used = len(self._lru)
+            scores = self._embeddings[:used] @ query
+            scores[self._limits[:used] != limit] = -1
+            slot = int(np.argmax(scores))
+            if scores[slot] < self.threshold:
+                return None
+
+            self._lru.move_to_end(slot)
+            return list(self._results[slot])
+
+    def set(self, embedding: np.ndarray, limit: int, version: int, character_ids: List[int]):
+        """Cache the character ids found for a query."""
+        query = self._normalize(embedding)
+        with self._lock:
+            if version != self._version or self._embeddings is None \
+                    or query.shape[0] != self._embeddings.shape[1]:
+                # The character data changed, so every cached result is stale
+                self._version = version
+                self._embeddings = np.zeros((self.max_entries, query.shape[0]), dtype=np.float32)
+                self._lru.clear()
+
+            if len(self._lru) < self.max_entries:
+                slot = len(self._lru)
+            else:
+                slot, _ = self._lru.popitem(last=False)
+
+            self._embeddings[slot] = query
+            self._limits[slot] = limit
+            self._results[slot] = list(character_ids)
+            self._lru[slot] = None
 
 
 class SemanticSearchService:
     """Service for semantic search using embeddings"""
-    def __init__(self):
+    def __init__(
+        self,
+        http_client: Optional[httpx.Client] = None,
+        http_async_client: Optional[httpx.AsyncClient] = None,
+    ):
         if not settings.OPENAI_API_KEY:
             raise ValueError("OpenAI API key not configured")
         self.embeddings = OpenAIEmbeddings(
             model="text-embedding-3-small",
-            api_key=settings.OPENAI_API_KEY
+            api_key=settings.OPENAI_API_KEY,
+            http_client=http_client,
+            http_async_client=http_async_client,
         )
+        # Failed requests raise, so only successful embeddings end up in the cache
+        self._cached_query_embedding = lru_cache(maxsize=QUERY_EMBEDDING_CACHE_SIZE)(
+            self._embed_query
+        )
+        self.query_cache = SemanticQueryCache()
+
+    def _embed_query(self, query: str) -> np.ndarray:
+        """Embed a normalized search query, raising on failure"""
+        embedding = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        # The array is shared by every cache hit
+        embedding.flags.writeable = False
+        return embedding
 
-    def generate_embedding(self, text: str) -> List[float]:
-        """Generate an embedding vector for the given text"""
+    def embed_query(self, query: str) -> Optional[np.ndarray]:
+        """Generate the embedding of a search query, reusing it for repeated queries"""
         try:
-            return self.embeddings.embed_query(text)
+            return self._cached_query_embedding(" ".join(query.lower().split()))
         except Exception as e:
-            print(f"Error generating embedding: {e}")
-            return []
+            logger.warning("Error generating embedding: %s", e)
+            return None
 
     def search_characters(self, query: str, limit: int = 5) -> List[Character]:
         """Perform semantic search on characters"""
-        query_embedding = self.generate_embedding(query)
-        if not query_embedding:
+        version = get_characters_cache_version()
+        cache_key = self._search_cache_key(query, limit, version)
+        character_ids = cache.get(cache_key)
+        if character_ids is not None:
+            return self._get_characters(character_ids)
+
+        query_embedding = self.embed_query(query)
+        if query_embedding is None:
             return []
 
-        # Get characters with embedding
-        characters = Character.objects.filter(description_embedding__isnull=False)
-        results = []
-        for character in characters:
-            if character.description_embedding is not None:
-                try:
-                    char_embedding = character.description_embedding
-                    similarity = cosine_similarity(
-                        [query_embedding], [char_embedding]
-                    )[0][0]
-                    results.append((character, similarity))
-                except Exception as e:
-                    print(f"Error calculating similarity for {character.name}: {e}")
-                    continue
-
-        # Sort by similarity and limit results
-        results.sort(key=lambda x: x[1], reverse=True)
-        return [char for char, _ in results[:limit]]
-
-    def update_character_embedding(self, character: Character):
-        """Update the character's embedding based on their description"""
-        description = character.get_description_for_embeddings()
-        embedding_vector = self.generate_embedding(description)
-        if embedding_vector:
-            character.description_embedding = embedding_vector
-            character.save(update_fields=["description_embedding"])
+        # Reuse the results of an earlier query with nearly the same meaning
+        character_ids = self.query_cache.get(query_embedding, limit, version)
+        if character_ids is not None:
+            cache.set(cache_key, character_ids, SEARCH_CACHE_TIMEOUT)
+            return self._get_characters(character_ids)
+
+        # Let pgvector rank the characters by cosine distance using the HNSW index.
+        # The index returns at most ef_search candidates before the other filters
+        # apply, so widen it for large limits.
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SET LOCAL hnsw.ef_search = %s",
+                    [max(HNSW_EF_SEARCH, limit * 2)],
+                )
+            characters = list(
+                Character.objects.only(*CharacterListSerializer.Meta.fields)
+                .filter(description_embedding__isnull=False)
+                .order_by(
+                    CosineDistance("description_embedding", HalfVector(query_embedding))
+                )[:limit]
+            )
+        character_ids = [character.id for character in characters]
+        cache.set(cache_key, character_ids, SEARCH_CACHE_TIMEOUT)
+        self.query_cache.set(query_embedding, limit, version, character_ids)
+        return characters
+
+    def _get_characters(self, character_ids: List[int]) -> List[Character]:
+        """Fetch cached search results, keeping their ranking."""
+        characters = Character.objects.only(*CharacterListSerializer.Meta.fields).in_bulk(
+            character_ids
+        )
+        # Characters deleted since the search are skipped
+        return [
+            characters[character_id] for character_id in character_ids
+            if character_id in characters
+        ]
+
+    def _search_cache_key(self, query: str, limit: int, version: int) -> str:
+        """Cache key for the results of a search query."""
+        query_hash = hashlib.sha256(f"{query}:{limit}".encode()).hexdigest()
+        return f"characters:v{version}:search:{query_hash}"
+
+    async def agenerate_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        """Generate float16 embedding vectors for many texts with batched requests"""
+        embedding_vectors = await self.embeddings.aembed_documents(texts)
+        return [np.asarray(vector, dtype=np.float16) for vector in embedding_vectors]
+
+
+@lru_cache(maxsize=1)
+def get_search_service() -> SemanticSearchService:
+    """Return the process-wide semantic search service.
 
+    Raises ValueError when the OpenAI API key is not configured; the
+    failure is not cached, so the next call tries again.
+    """
+    return SemanticSearchService()
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_characters_cache_version
+from .models import Character, Master
+
+
+@receiver(post_save, sender=Character)
+@receiver(post_delete, sender=Character)
+@receiver(post_save, sender=Master)
+@receiver(post_delete, sender=Master)
+def invalidate_characters_cache(sender, **kwargs):
+    """Invalidate cached character responses when character data changes."""
+    bump_characters_cache_version()
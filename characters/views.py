@@ -1,13 +1,25 @@
+import logging
+import re
+
 from rest_framework import generics, status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 import django_filters
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, Prefetch
+from django.views.decorators.cache import cache_control, cache_page
+from django.views.decorators.http import etag
 
-from .models import Character
+from .cache import get_characters_cache_version
+from .models import Character, Master
 from .serializers import CharacterListSerializer, CharacterDetailSerializer, CharacterSearchSeializer
-from .services import SemanticSearchService
+from .services import get_search_service
+
+logger = logging.getLogger(__name__)
+
+# Minimum length of the list view's ?search= term
+MIN_SEARCH_LENGTH = 2
 
 
 class CharacterFilter(django_filters.FilterSet):
@@ -26,9 +38,30 @@ class CharacterFilter(django_filters.FilterSet):
             'min_evilness_score', 'max_evilness_score'
         ]
 
-class CharacterListView(generics.ListAPIView):
+class CharacterCacheMixin:
+    """Cache responses until the character data changes.
+
+    Responses carry an ETag derived from the character cache version, so
+    clients revalidating an unchanged resource get a 304 Not Modified.
+    """
+    cache_timeout = 60 * 60
+    client_cache_timeout = 60
+
+    def dispatch(self, request, *args, **kwargs):
+        version = get_characters_cache_version()
+        cached_dispatch = cache_page(
+            self.cache_timeout, key_prefix=f"characters:v{version}"
+        )(super().dispatch)
+        conditional_dispatch = etag(
+            lambda request, *args, **kwargs: f"characters-v{version}"
+        )(cached_dispatch)
+        return cache_control(max_age=self.client_cache_timeout, public=True)(
+            conditional_dispatch
+        )(request, *args, **kwargs)
+
+class CharacterListView(CharacterCacheMixin, generics.ListAPIView):
     """List all Star Wars characters with filtering"""
-    queryset = Character.objects.all()
+    queryset = Character.objects.only(*CharacterListSerializer.Meta.fields)
     serializer_class = CharacterListSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = CharacterFilter
@@ -37,20 +70,40 @@ class CharacterListView(generics.ListAPIView):
     def get_queryset(self):
         """Custom queryset with search functionality."""
         queryset = super().get_queryset()
-        search = self.request.query_params.get('search', None)
+        search = (self.request.query_params.get('search') or '').strip()
 
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(species__icontains=search) |
-                Q(homeworld__icontains=search)
+        # Searches shorter than MIN_SEARCH_LENGTH would match nearly every character
+        if len(search) >= MIN_SEARCH_LENGTH:
+            # Match every word of the search as a prefix in the full-text search document
+            terms = re.findall(r'\w+', search)
+            if not terms:
+                return queryset.none()
+
+            search_query = SearchQuery(
+                ' & '.join(f'{term}:*' for term in terms), config='simple', search_type='raw'
             )
+            queryset = queryset.filter(search_vec=search_query).annotate(
+                rank=SearchRank(F('search_vec'), search_query)
+            ).order_by('-rank', 'name')
 
         return queryset
 
-class CharacterDetailView(generics.RetrieveAPIView):
+    def list(self, request, *args, **kwargs):
+        """List characters as plain dicts, skipping model and serializer instantiation."""
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            *CharacterListSerializer.Meta.fields
+        )
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(list(queryset))
+
+class CharacterDetailView(CharacterCacheMixin, generics.RetrieveAPIView):
     """Retrieve detailed information about a specific character"""
-    queryset = Character.objects.all()
+    queryset = Character.objects.defer('description_embedding').prefetch_related(
+        Prefetch('masters', queryset=Master.objects.only('id', 'master_name', 'character_id'))
+    )
     serializer_class = CharacterDetailSerializer
     lookup_field = 'id'
 
@@ -68,12 +121,14 @@ def semantic_search_characters(request):
     limit = serializer.validated_data.get('limit', 5)
 
     try:
-        search_service = SemanticSearchService()
-        print(f"Performing semantic search for query: '{query}' with limit {limit}")
+        search_service = get_search_service()
+        logger.debug("Performing semantic search for query: '%s' with limit %s", query, limit)
 
         characters = search_service.search_characters(query, limit)
 
-        print(f"Semantic search results for query '{query}': {len(characters)} characters found")
+        logger.debug(
+            "Semantic search results for query '%s': %s characters found", query, len(characters)
+        )
 
         # Serialize the results
         character_serializer = CharacterListSerializer(characters, many=True)
@@ -86,7 +141,7 @@ def semantic_search_characters(request):
         })
 
     except ValueError as e:
-        print(f"Search service error: {e}")
+        logger.warning("Search service error: %s", e)
         return Response(
             {"error": "Search service not available. Please try again later."},
             status=status.HTTP_503_SERVICE_UNAVAILABLE
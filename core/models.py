@@ -8,7 +8,7 @@ class SoftDeleteManager(models.Manager):
 
 class SoftDeleteModel(models.Model):
     """Abstract base model for soft deletion."""
-    is_deleted = models.BooleanField(default=False, db_index=True)
+    is_deleted = models.BooleanField(default=False)
 
     objects = SoftDeleteManager()
     all_objects = models.Manager()  # Manager to access all objects, including deleted ones
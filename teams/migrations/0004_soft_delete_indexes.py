@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-15 20:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0009_soft_delete_indexes'),
+        ('teams', '0003_team_is_deleted_teammember_is_deleted'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='team',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='teammember',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(fields=['is_deleted', '-created_at'], name='team_deleted_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teammember',
+            index=models.Index(fields=['team', 'is_deleted'], name='tm_team_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teammember',
+            index=models.Index(fields=['character', 'is_deleted'], name='tm_character_deleted_idx'),
+        ),
+    ]
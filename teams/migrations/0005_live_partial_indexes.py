@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-15 20:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0009_soft_delete_indexes'),
+        ('teams', '0004_soft_delete_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='team',
+            name='team_deleted_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='teammember',
+            name='tm_team_deleted_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='teammember',
+            name='tm_character_deleted_idx',
+        ),
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-created_at'], name='team_live_created'),
+        ),
+        migrations.AddIndex(
+            model_name='teammember',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['team'], name='tm_live_team'),
+        ),
+        migrations.AddIndex(
+            model_name='teammember',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['character'], name='tm_live_character'),
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Avg, Count, Exists, OuterRef, Q
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 
@@ -20,9 +21,13 @@ class Team(SoftDeleteModel):
 
     class Meta:
         ordering = ['-created_at']
+        # Partial indexes only cover live rows, which is what the default manager queries
+        indexes = [
+            models.Index(name='team_live_created', fields=['-created_at'], condition=Q(is_deleted=False)),
+        ]
 
     def __str__(self):
-        return f"{self.name} ({self.team_members.count()}/{self.MAX_MEMBERS} members)"
+        return f"{self.name} ({self.member_count}/{self.MAX_MEMBERS} members)"
 
     def clean(self):
         """Validate team contraints."""
@@ -39,24 +44,39 @@ class Team(SoftDeleteModel):
 
     def can_add_member(self, character):
         """Check if a character can be added to the team"""
-        if self.members.count() >= self.MAX_MEMBERS:
+        # Fetch the member count and the existing membership in a single query.
+        # Removed memberships still occupy the (team, character) pair.
+        team_state = Team.all_objects.filter(pk=self.pk).annotate(
+            _member_count=Count('team_members', filter=Q(team_members__is_deleted=False)),
+            _is_member=Exists(
+                TeamMember.all_objects.filter(team=OuterRef('pk'), character=character)
+            ),
+        ).values('_member_count', '_is_member').get()
+
+        if team_state['_member_count'] >= self.MAX_MEMBERS:
             return False, f"Team is full ({self.MAX_MEMBERS} members max)."
 
         if character.is_evil:
             return False, f"{character.name} is evil and cannot join the team."
 
-        if self.members.filter(id=character.id).exists():
+        if team_state['_is_member']:
             return False, f"{character.name} is already a member of the team."
 
         return True, f"{character.name} can join the team."
 
     def add_member(self, character):
         """Add a character to the team with validation"""
-        can_add, message = self.can_add_member(character)
-        if not can_add:
-            raise ValidationError(message)
+        with transaction.atomic():
+            # Lock the team row so concurrent additions are validated one after another.
+            # The check runs as a separate statement so it sees the members committed
+            # by the transaction that held the lock before us.
+            Team.all_objects.select_for_update().filter(pk=self.pk).values('pk').get()
 
-        team_member = TeamMember.objects.create(team=self, character=character)
+            can_add, message = self.can_add_member(character)
+            if not can_add:
+                raise ValidationError(message)
+
+            team_member = TeamMember.objects.create(team=self, character=character)
         return team_member
 
     def remove_member(self, character):
@@ -68,20 +88,30 @@ class Team(SoftDeleteModel):
         except TeamMember.DoesNotExist:
             return False
 
+    @property
+    def member_count(self):
+        """Number of team members, read from the `_member_count` annotation when present."""
+        member_count = getattr(self, '_member_count', None)
+        if member_count is None:
+            return self.team_members.count()
+        return member_count
+
     @property
     def is_full(self):
         """Check if team is at maximum capacity."""
-        return self.team_members.count() >= self.MAX_MEMBERS
+        return self.member_count >= self.MAX_MEMBERS
 
     @property
     def average_evilness_score(self):
-        """Calculate the average evilness score of team members."""
-        members = self.members.all()
-        if not members:
-            return 0
-
-        total_score = sum(member.evilness_score for member in members)
-        return round(total_score / len(members))
+        """Average evilness score of team members, read from the `_avg_evilness` annotation when present."""
+        if hasattr(self, '_avg_evilness'):
+            average = self._avg_evilness
+        else:
+            # Same rows as the annotation: active memberships of characters that still exist
+            average = self.team_members.filter(character__is_deleted=False).aggregate(
+                average=Avg('character__evilness_score')
+            )['average']
+        return round(average or 0)
 
 class TeamMember(SoftDeleteModel):
     """Many-to-many relationship between teams and characters."""
@@ -94,6 +124,10 @@ class TeamMember(SoftDeleteModel):
     class Meta:
         unique_together = ('team', 'character')
         ordering = ['joined_at']
+        indexes = [
+            models.Index(name='tm_live_team', fields=['team'], condition=Q(is_deleted=False)),
+            models.Index(name='tm_live_character', fields=['character'], condition=Q(is_deleted=False)),
+        ]
 
     def __str__(self):
         return f"{self.character.name} in {self.team.name}"
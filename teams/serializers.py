@@ -1,3 +1,4 @@
+from django.db.models import Count
 from rest_framework import serializers
 
 from .models import Team, TeamMember
@@ -24,7 +25,7 @@ class TeamListSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'member_count', 'is_full', 'created_at']
 
     def get_member_count(self, obj):
-        return obj.members.count()
+        return obj.member_count
 
 class TeamDetailSerializer(serializers.ModelSerializer):
     """Serializer for detailed team information"""
@@ -42,30 +43,43 @@ class TeamDetailSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
 
+    @staticmethod
+    def members_queryset():
+        """Team members with only the columns the member serializer renders."""
+        return TeamMember.objects.select_related('character').only(
+            'id', 'joined_at', 'team', 'character',
+            *(f'character__{field}' for field in CharacterListSerializer.Meta.fields),
+        )
+
     def get_members(self, obj):
-        """Return serialized team members."""
-        team_members = TeamMember.objects.filter(team=obj).select_related('character')
+        """Return serialized team members, using the `prefetched_members` prefetch when present."""
+        team_members = getattr(obj, 'prefetched_members', None)
+        if team_members is None:
+            team_members = self.members_queryset().filter(team=obj)
         return TeamMemberSerializer(team_members, many=True).data
 
     def get_member_count(self, obj):
-        return obj.members.count()
+        return obj.member_count
 
     def get_team_stats(self, obj):
         """Generate team statistics."""
-        members = obj.members.all()
-        if not members:
+        # Count the live members per species & homeworld combination in the database
+        groups = obj.team_members.filter(character__is_deleted=False).values(
+            'character__species', 'character__homeworld',
+        ).annotate(count=Count('id'))
+        if not groups:
             return {}
 
         # Species & homewold distribution
         species_count = {}
         homeworld_count = {}
 
-        for member in members:
-            species = member.species or 'Unknown'
-            homeworld = member.homeworld or 'Unknown'
+        for group in groups:
+            species = group['character__species'] or 'Unknown'
+            homeworld = group['character__homeworld'] or 'Unknown'
 
-            species_count[species] = species_count.get(species, 0) + 1
-            homeworld_count[homeworld] = homeworld_count.get(homeworld, 0) + 1
+            species_count[species] = species_count.get(species, 0) + group['count']
+            homeworld_count[homeworld] = homeworld_count.get(homeworld, 0) + group['count']
 
         return {
             'species_distribution': species_count,
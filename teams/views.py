@@ -1,9 +1,11 @@
 from rest_framework import generics, status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from django.core.exceptions import ValidationError
+from django.db.models import Avg, Count, Prefetch, Q
 from django.shortcuts import get_object_or_404
 
-from .models import Team, TeamMember
+from .models import Team
 from .serializers import (
     TeamListSerializer,
     TeamDetailSerializer,
@@ -13,6 +15,11 @@ from .serializers import (
 )
 from characters.models import Character
 
+# Number of active members, annotated on team querysets as `_member_count`
+MEMBER_COUNT = Count(
+    "team_members", filter=Q(team_members__is_deleted=False), distinct=True
+)
+
 
 class TeamListCreateView(generics.ListCreateAPIView):
     """
@@ -22,7 +29,8 @@ class TeamListCreateView(generics.ListCreateAPIView):
     POST /api/teams/ - Create a new team
     """
 
-    queryset = Team.objects.all()
+    # Aggregations drop the default ordering, which pagination needs
+    queryset = Team.objects.annotate(_member_count=MEMBER_COUNT).order_by("-created_at")
 
     def get_serializer_class(self):
         if self.request.method == "POST":
@@ -46,7 +54,22 @@ class TeamDetailView(generics.RetrieveUpdateDestroyAPIView):
     DELETE /api/teams/{id}/ - Delete team
     """
 
-    queryset = Team.objects.all()
+    queryset = Team.objects.annotate(
+        _member_count=MEMBER_COUNT,
+        _avg_evilness=Avg(
+            "team_members__character__evilness_score",
+            filter=Q(
+                team_members__is_deleted=False,
+                team_members__character__is_deleted=False,
+            ),
+        ),
+    ).prefetch_related(
+        Prefetch(
+            "team_members",
+            queryset=TeamDetailSerializer.members_queryset(),
+            to_attr="prefetched_members",
+        )
+    )
 
     def get_serializer_class(self):
         if self.request.method in ["PUT", "PATCH"]:
@@ -75,13 +98,11 @@ def add_member(request, team_id):
     try:
         character = Character.objects.get(id=character_id)
 
-        # Check if character can be added
-        can_add, message = team.can_add_member(character)
-        if not can_add:
-            return Response({"error": message}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Add member to team
-        team_member = TeamMember.objects.create(team=team, character=character)
+        # Add member to team, validating it under a lock on the team
+        try:
+            team.add_member(character)
+        except ValidationError as e:
+            return Response({"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
 
         # Return serialized team member
         team_serailizer = TeamDetailSerializer(team)